@@ -12,33 +12,76 @@ Steps performed:
   1. Clean up all previous installation traces
   2. Check prerequisites (Node.js, npm, Python 3, pip)
   3. Build the extension (once)
-  4. Install Python dependencies (websockets)
+  4. Install Python dependencies (websockets, orjson, psutil)
   5. Enumerate Chrome profiles and prompt for selection
   6. For each selected profile, create a separate extension bundle
   7. Guide user to load each bundle, then confirm detection
   8. Register native messaging host with all detected extension IDs
 """
 
-import glob
+import concurrent.futures
+import contextlib
+import ctypes
+import functools
+import hashlib
+import importlib.metadata
+import importlib.util
 import json
+import mmap
 import os
 import platform
+import re
+import select
 import shutil
 import signal
 import socket
+import struct
 import subprocess
 import sys
+import time
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
 
 HOST_NAME = "com.claude.browser_agent"
 WS_PORT = 7680
+# websockets is needed by the native host (>=14 for its asyncio server API)
+PYTHON_DEPS = ["websockets>=14"]
+# Speedups for the installer and host; both work without them, and they may
+# have no wheel for a new or unusual Python, so they're installed separately
+OPTIONAL_PYTHON_DEPS = ["orjson", "psutil"]
+SECURE_PREFS = "Secure Preferences"
+EXTENSION_NAME = "Claude (Headless)"
+EXTENSION_NAME_MARKER = f'"{EXTENSION_NAME}"'.encode()
 
 SYSTEM = platform.system()
+if SYSTEM != "Windows":
+    # Faster event loop for the native host; it falls back to asyncio without it
+    OPTIONAL_PYTHON_DEPS.append("uvloop")
 
 # Directories relative to this script
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DIST_DIR = os.path.join(SCRIPT_DIR, "dist")
 NATIVE_HOST_DIR = os.path.join(SCRIPT_DIR, "native-host")
 HOST_SCRIPT = os.path.join(NATIVE_HOST_DIR, "host.py")
+# Native separators (backslashes on Windows) for the wrapper and shebang
+PYTHON_EXE = os.path.normpath(sys.executable)
+PACKAGE_JSON = os.path.join(SCRIPT_DIR, "package.json")
+PACKAGE_LOCK = os.path.join(SCRIPT_DIR, "package-lock.json")
+NODE_MODULES_DIR = os.path.join(SCRIPT_DIR, "node_modules")
+NPM_DEPS_STAMP = os.path.join(NODE_MODULES_DIR, ".webrig-lock-hash")
 
 
 def get_webrig_dir() -> str:
@@ -75,6 +118,23 @@ def header(msg: str) -> None:
     print(f"{'='*60}")
 
 
+def _json_loads(data: bytes | memoryview):
+    """Decode JSON bytes, with orjson when available.
+
+    orjson reads memoryviews in place; the stdlib needs a bytes copy.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(bytes(data) if isinstance(data, memoryview) else data)
+
+
+def _json_dumps(obj) -> bytes:
+    """Encode obj as indented UTF-8 JSON, with orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode("utf-8")
+
+
 def run(cmd: list[str], cwd: str | None = None, check: bool = True) -> subprocess.CompletedProcess:
     """Run a command, printing it first."""
     display = " ".join(cmd)
@@ -82,21 +142,94 @@ def run(cmd: list[str], cwd: str | None = None, check: bool = True) -> subproces
     return subprocess.run(cmd, cwd=cwd, check=check)
 
 
+@functools.lru_cache(maxsize=None)
 def which(name: str) -> str | None:
-    """Cross-platform which."""
+    """Cross-platform which, memoized since PATH doesn't change during install."""
     return shutil.which(name)
 
 
 # ── 1. Cleanup ──────────────────────────────────────────────────
 
-def kill_process_on_port(port: int) -> None:
+def _kill_port_owner_psutil(port: int) -> bool:
+    """Terminate whatever is listening on port, without spawning netstat/lsof.
+
+    Returns False if sockets could not be enumerated (e.g. macOS without
+    root), so the caller can fall back to the subprocess path.
+    """
+    try:
+        pids = {
+            # The host only listens on IPv4 TCP; skip UDP and IPv6 tables
+            c.pid for c in psutil.net_connections(kind="tcp4")
+            if c.pid and c.laddr and c.laddr.port == port and c.status == psutil.CONN_LISTEN
+        }
+    except psutil.AccessDenied:
+        return False
+
+    if not pids:
+        # The bind probe saw the port taken, but its owner isn't visible to
+        # us (e.g. another user's process without root)
+        warn(f"Port {port} is in use by a process we can't see.")
+        warn(f"Could not auto-kill process on port {port}. Free it manually if needed.")
+        return True
+
+    warn(f"Port {port} is in use — killing stale process...")
+    procs = []
+    try:
+        for pid in pids:
+            info(f"Killing PID {pid}")
+            try:
+                proc = psutil.Process(pid)
+                proc.terminate()
+                procs.append(proc)
+            except psutil.NoSuchProcess:
+                pass
+
+        # Block until the owners have actually exited, so the port is free
+        # by the time we return; escalate to SIGKILL for stragglers.
+        _gone, alive = psutil.wait_procs(procs, timeout=2)
+        for proc in alive:
+            try:
+                proc.kill()
+            except psutil.NoSuchProcess:
+                pass
+        _gone, alive = psutil.wait_procs(alive, timeout=1)
+    except psutil.AccessDenied:
+        warn(f"Could not auto-kill process on port {port}. Free it manually if needed.")
+        return True
+
+    if alive:
+        warn(f"Could not auto-kill process on port {port}. Free it manually if needed.")
+        return True
+
+    info(f"Port {port} freed.")
+    return True
+
+
+def _port_in_use(port: int) -> bool:
+    """Check whether port is taken on localhost by trying to bind it.
+
+    Unlike a connect probe this needs no TCP round-trip and cannot block.
+    """
     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     try:
-        sock.settimeout(1)
-        if sock.connect_ex(("127.0.0.1", port)) != 0:
-            return
+        if SYSTEM != "Windows":
+            # Ignore TIME_WAIT leftovers. On Windows SO_REUSEADDR would let
+            # the bind succeed even with a live listener.
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(("127.0.0.1", port))
+    except OSError:
+        return True
     finally:
         sock.close()
+    return False
+
+
+def kill_process_on_port(port: int) -> None:
+    if not _port_in_use(port):
+        return
+
+    if psutil is not None and _kill_port_owner_psutil(port):
+        return
 
     warn(f"Port {port} is in use — killing stale process...")
 
@@ -105,14 +238,19 @@ def kill_process_on_port(port: int) -> None:
             output = subprocess.check_output(
                 ["netstat", "-ano"], text=True, stderr=subprocess.DEVNULL
             )
+            # netstat lists a listener once per address family; dedupe, then
+            # stop them all with one taskkill instead of one per PID.
+            pids = set()
             for line in output.splitlines():
-                if f":{port}" in line and "LISTENING" in line:
-                    pid = int(line.strip().split()[-1])
+                parts = line.split()
+                if len(parts) == 5 and parts[1].endswith(f":{port}") and parts[3] == "LISTENING":
+                    pids.add(int(parts[4]))
+            if pids:
+                cmd = ["taskkill", "/F"]
+                for pid in sorted(pids):
                     info(f"Killing PID {pid}")
-                    subprocess.call(
-                        ["taskkill", "/PID", str(pid), "/F"],
-                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
-                    )
+                    cmd += ["/PID", str(pid)]
+                subprocess.call(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
         else:
             output = subprocess.check_output(
                 ["lsof", "-ti", f":{port}"], text=True, stderr=subprocess.DEVNULL
@@ -128,6 +266,28 @@ def kill_process_on_port(port: int) -> None:
     info(f"Port {port} freed.")
 
 
+# Slow work that doesn't need the user (tree deletions, which can take
+# seconds each with Defender scanning every file, and pip) runs here while
+# the user answers prompts.
+_background = concurrent.futures.ThreadPoolExecutor(max_workers=3)
+_pending_removals: dict[str, concurrent.futures.Future] = {}
+
+
+def _remove_in_background(path: str) -> None:
+    _pending_removals[path] = _background.submit(shutil.rmtree, path)
+
+
+def _wait_for_removal(*paths: str) -> None:
+    """Block until queued removals of paths (default: all) have finished.
+
+    Re-raises any error from the removal.
+    """
+    for path in paths or list(_pending_removals):
+        future = _pending_removals.pop(path, None)
+        if future is not None:
+            future.result()
+
+
 def cleanup_previous_install() -> None:
     """Remove all traces of previous WebRig installations."""
     header("Cleaning up previous installation")
@@ -171,18 +331,19 @@ def cleanup_previous_install() -> None:
 
     # Remove .webrig directory
     if os.path.isdir(WEBRIG_DIR):
-        shutil.rmtree(WEBRIG_DIR)
-        info(f"Removed app data: {WEBRIG_DIR}")
+        _remove_in_background(WEBRIG_DIR)
+        info(f"Removing app data: {WEBRIG_DIR}")
     else:
         info("No app data directory found")
 
     # Remove all dist-* directories (profile-specific bundles)
     removed_any = False
-    for d in glob.glob(os.path.join(SCRIPT_DIR, "dist-*")):
-        if os.path.isdir(d):
-            shutil.rmtree(d)
-            info(f"Removed: {os.path.basename(d)}")
-            removed_any = True
+    with os.scandir(SCRIPT_DIR) as entries:
+        for entry in entries:
+            if entry.name.startswith("dist-") and entry.is_dir(follow_symlinks=False):
+                _remove_in_background(entry.path)
+                info(f"Removing: {entry.name}")
+                removed_any = True
     if not removed_any:
         info("No previous profile bundles found")
 
@@ -191,21 +352,49 @@ def cleanup_previous_install() -> None:
 
 # ── 2. Prerequisites ────────────────────────────────────────────
 
+_NODE_NPM_VERSIONS_JS = (
+    "process.stdout.write(process.versions.node + '\\n');"
+    "process.stdout.write(require('child_process').execSync('npm -v').toString())"
+)
+
+
+def _node_npm_versions(node: str) -> tuple[str, str] | None:
+    """Get the Node.js and npm versions from a single node process."""
+    try:
+        output = subprocess.check_output(
+            [node, "-e", _NODE_NPM_VERSIONS_JS], text=True, stderr=subprocess.DEVNULL
+        )
+    except (subprocess.CalledProcessError, OSError):
+        return None
+    lines = output.split()
+    if len(lines) != 2:
+        return None
+    return f"v{lines[0]}", lines[1]
+
+
 def check_prerequisites() -> bool:
     header("Checking prerequisites")
     ok = True
 
     node = which("node")
+    npm = which("npm")
+    versions = _node_npm_versions(node) if node and npm else None
+
     if node:
-        version = subprocess.check_output([node, "--version"], text=True).strip()
+        if versions:
+            version = versions[0]
+        else:
+            version = subprocess.check_output([node, "--version"], text=True).strip()
         info(f"Node.js: {version} ({node})")
     else:
         error("Node.js not found. Install from https://nodejs.org/")
         ok = False
 
-    npm = which("npm")
     if npm:
-        version = subprocess.check_output([npm, "--version"], text=True).strip()
+        if versions:
+            version = versions[1]
+        else:
+            version = subprocess.check_output([npm, "--version"], text=True).strip()
         info(f"npm: {version} ({npm})")
     else:
         error("npm not found. It should come with Node.js.")
@@ -213,13 +402,10 @@ def check_prerequisites() -> bool:
 
     info(f"Python: {sys.version.split()[0]} ({sys.executable})")
 
-    try:
-        subprocess.check_output(
-            [sys.executable, "-m", "pip", "--version"],
-            text=True, stderr=subprocess.DEVNULL,
-        )
+    # Locate pip in-process rather than starting another interpreter
+    if importlib.util.find_spec("pip") is not None:
         info("pip: available")
-    except (subprocess.CalledProcessError, FileNotFoundError):
+    else:
         warn("pip not found. Python dependencies will need manual install.")
 
     if os.path.exists(HOST_SCRIPT):
@@ -233,6 +419,48 @@ def check_prerequisites() -> bool:
 
 # ── 3. Build extension ──────────────────────────────────────────
 
+def _npm_deps_hash() -> str | None:
+    """Fingerprint package.json + package-lock.json, or None without a lockfile."""
+    digest = hashlib.sha256()
+    try:
+        for path in (PACKAGE_JSON, PACKAGE_LOCK):
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def install_npm_deps(npm: str) -> bool:
+    """Install npm dependencies unless node_modules already matches the lockfile."""
+    deps_hash = _npm_deps_hash()
+    if deps_hash and os.path.isdir(NODE_MODULES_DIR):
+        try:
+            with open(NPM_DEPS_STAMP, "r") as f:
+                if f.read().strip() == deps_hash:
+                    info("npm dependencies up to date (package-lock.json unchanged)")
+                    return True
+        except OSError:
+            pass
+
+    info("Installing npm dependencies...")
+    if deps_hash:
+        cmd = [npm, "ci", "--prefer-offline", "--no-audit", "--no-fund"]
+    else:
+        cmd = [npm, "install"]
+    result = subprocess.run(cmd, cwd=SCRIPT_DIR)
+    if result.returncode != 0:
+        error(f"npm {cmd[1]} failed.")
+        return False
+
+    # npm install may have just created the lockfile
+    deps_hash = deps_hash or _npm_deps_hash()
+    if deps_hash:
+        with open(NPM_DEPS_STAMP, "w") as f:
+            f.write(deps_hash)
+    return True
+
+
 def build_extension() -> bool:
     header("Building extension")
 
@@ -241,10 +469,7 @@ def build_extension() -> bool:
         error("npm not found. Cannot build.")
         return False
 
-    info("Installing npm dependencies...")
-    result = subprocess.run([npm, "install"], cwd=SCRIPT_DIR)
-    if result.returncode != 0:
-        error("npm install failed.")
+    if not install_npm_deps(npm):
         return False
 
     info("Building extension (vite + tsc)...")
@@ -264,25 +489,94 @@ def build_extension() -> bool:
 
 # ── 4. Python dependencies ──────────────────────────────────────
 
-def install_python_deps() -> bool:
+def start_python_deps_install() -> concurrent.futures.Future | None:
+    """Check Python dependencies and start installing any missing ones.
+
+    pip runs in the background with its output captured, so it overlaps
+    with the profile prompts. Pass the returned future (None if nothing
+    was missing) to finish_python_deps_install().
+    """
     header("Installing Python dependencies")
+    missing = []
+    missing_optional = []
+    for deps, missing_list in ((PYTHON_DEPS, missing), (OPTIONAL_PYTHON_DEPS, missing_optional)):
+        for pkg in deps:
+            if _dep_installed(pkg):
+                info(f"{pkg} already installed")
+            else:
+                missing_list.append(pkg)
+
+    if not missing and not missing_optional:
+        return None
+
+    info(f"Installing {' '.join(missing + missing_optional)} in the background...")
+    return _background.submit(_pip_install_all, missing, missing_optional)
+
+
+def _dep_installed(requirement: str) -> bool:
+    """Check a "name" or "name>=version" requirement against what is installed."""
+    name, _, min_version = requirement.partition(">=")
+    # find_spec locates the package without executing it
+    if importlib.util.find_spec(name) is None:
+        return False
+    if not min_version:
+        return True
     try:
-        import websockets  # noqa: F401
-        info("websockets already installed")
+        installed = importlib.metadata.version(name)
+    except importlib.metadata.PackageNotFoundError:
+        return False
+    return _version_tuple(installed) >= _version_tuple(min_version)
+
+
+def _version_tuple(version: str) -> tuple[int, ...]:
+    # Leading release segment only: "14.0rc1" -> (14, 0)
+    match = re.match(r"\d+(?:\.\d+)*", version)
+    return tuple(int(part) for part in match.group().split(".")) if match else ()
+
+
+def _pip_install_all(
+    required: list[str], optional: list[str],
+) -> list[tuple[list[str], bool, subprocess.CompletedProcess]]:
+    """Install the required and optional packages in separate pip runs.
+
+    pip builds every wheel before installing anything, so one optional
+    package that can't be built must not take websockets down with it.
+    Returns (packages, required, result) for each run.
+    """
+    results = []
+    for packages, is_required in ((required, True), (optional, False)):
+        if packages:
+            result = subprocess.run(
+                [sys.executable, "-m", "pip", "install", *packages],
+                capture_output=True, text=True, check=False,
+            )
+            results.append((packages, is_required, result))
+    return results
+
+
+def finish_python_deps_install(future: concurrent.futures.Future | None) -> bool:
+    """Wait for a background pip install and report how it went."""
+    if future is None:
         return True
-    except ImportError:
-        pass
 
-    info("Installing websockets...")
-    result = subprocess.run(
-        [sys.executable, "-m", "pip", "install", "websockets"],
-        check=False,
-    )
-    if result.returncode != 0:
-        error("Failed to install websockets. Install manually: pip install websockets")
-        return False
-    info("websockets installed")
-    return True
+    if not future.done():
+        # pip's output is captured, so say why nothing is happening
+        info("Waiting for pip to finish...")
+    ok = True
+    for packages, is_required, result in future.result():
+        names = " ".join(packages)
+        if result.returncode == 0:
+            info(f"{names} installed")
+            continue
+        # Quote version specifiers so the suggested command is safe to paste into a shell
+        args = " ".join(f'"{pkg}"' if ">" in pkg else pkg for pkg in packages)
+        if is_required:
+            print(result.stdout + result.stderr)
+            error(f"Failed to install {names}. Install manually: pip install {args}")
+            ok = False
+        else:
+            warn(f"Could not install optional {names}; continuing without them (pip install {args} to retry).")
+    return ok
 
 
 # ── 5. Chrome profile enumeration ───────────────────────────────
@@ -296,43 +590,119 @@ def chrome_user_data_dir() -> str:
         return os.path.expanduser("~/.config/google-chrome")
 
 
-def enumerate_chrome_profiles() -> list[dict]:
-    """Find all Chrome profiles and their display names.
+# Filesystem-safe slug for bundle directory names (dist-<slug>)
+_SLUG_RE = re.compile(r"[^a-z0-9-]+")
+
+
+def _read_profile_fields(prefs_path: str) -> tuple[str | None, str | None]:
+    """Return (profile.name, account_info[0].email) from a Preferences file.
 
-    Returns list of dicts with keys: dir, name, path
+    With ijson available the file is stream-parsed and reading stops once
+    both fields are known, instead of building the whole (often multi-MB)
+    document. Raises ValueError on malformed JSON and OSError on read failure.
     """
-    chrome_dir = chrome_user_data_dir()
-    profiles = []
+    if ijson is None:
+        with open(prefs_path, "rb") as f:
+            prefs = _json_loads(f.read())
+        acct = prefs.get("account_info", [])
+        return prefs.get("profile", {}).get("name"), acct[0].get("email") if acct else None
+
+    name = email = None
+    first_account_done = False
+    with open(prefs_path, "rb") as f:
+        try:
+            for prefix, event, value in ijson.parse(f):
+                if prefix == "profile.name" and name is None:
+                    name = value
+                elif prefix == "account_info.item.email" and not first_account_done:
+                    email = value
+                elif prefix == "account_info.item" and event == "end_map":
+                    first_account_done = True
+                if name is not None and first_account_done:
+                    break
+        except ijson.JSONError as e:
+            raise ValueError(str(e)) from e
+    return name, email
+
+
+def _parse_profile(entry: os.DirEntry) -> dict | None:
+    """Read a profile's display name from its Preferences file.
+
+    Returns a profile dict, or None if the directory has no readable
+    Preferences (i.e. it isn't a profile).
+    """
+    profile_dir = entry.name
 
-    for prefs_path in glob.glob(os.path.join(chrome_dir, "*", "Preferences")):
-        profile_dir = os.path.basename(os.path.dirname(prefs_path))
+    try:
+        name, email = _read_profile_fields(os.path.join(entry.path, "Preferences"))
+    except (ValueError, OSError):
+        return None
 
-        # Skip non-profile directories
-        if profile_dir in ("System Profile", "Guest Profile"):
-            continue
+    if name is None:
+        name = profile_dir
+
+    if name and email:
+        display_name = f"{name} ({email})"
+    elif name:
+        display_name = name
+    else:
+        display_name = profile_dir
 
+    return {
+        "dir": profile_dir,
+        "slug": _SLUG_RE.sub("-", profile_dir.lower()),
+        "name": display_name,
+        "path": entry.path,
+    }
+
+
+def _prefetch(paths: list[str]) -> None:
+    """Ask the kernel to start reading files into the page cache.
+
+    Lets cold-cache reads of several profiles queue up on the disk at once
+    instead of stalling one after another. No-op without posix_fadvise.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    for path in paths:
         try:
-            with open(prefs_path, "r", encoding="utf-8") as f:
-                prefs = json.load(f)
-        except (json.JSONDecodeError, OSError):
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
             continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
 
-        name = prefs.get("profile", {}).get("name", profile_dir)
-        acct = prefs.get("account_info", [])
-        email = acct[0].get("email") if acct else None
 
-        if name and email:
-            display_name = f"{name} ({email})"
-        elif name:
-            display_name = name
-        else:
-            display_name = profile_dir
+def enumerate_chrome_profiles() -> list[dict]:
+    """Find all Chrome profiles and their display names.
 
-        profiles.append({
-            "dir": profile_dir,
-            "name": display_name,
-            "path": os.path.dirname(prefs_path),
-        })
+    Preferences files are parsed concurrently since each can be several MB.
+
+    Returns list of dicts with keys: dir, slug, name, path
+    """
+    chrome_dir = chrome_user_data_dir()
+    try:
+        with os.scandir(chrome_dir) as it:
+            # Directories without a Preferences file are weeded out by the
+            # failed open in _parse_profile rather than an extra stat here.
+            entries = [
+                e for e in it
+                if e.is_dir() and e.name not in ("System Profile", "Guest Profile")
+            ]
+    except OSError:
+        return []
+    if not entries:
+        return []
+
+    # Secure Preferences is read again during extension detection
+    _prefetch([os.path.join(e.path, name) for e in entries for name in ("Preferences", SECURE_PREFS)])
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(8, len(entries))) as ex:
+        profiles = [p for p in ex.map(_parse_profile, entries) if p]
 
     return sorted(profiles, key=lambda p: p["dir"])
 
@@ -382,116 +752,317 @@ def select_profiles(profiles: list[dict]) -> list[dict]:
 
 # ── 6. Per-profile extension setup ──────────────────────────────
 
-def profile_slug(profile: dict) -> str:
-    """Create a filesystem-safe slug from the profile directory name."""
-    return profile["dir"].lower().replace(" ", "-")
+def _hardlink_tree(src: str, dst: str) -> None:
+    """Mirror src into dst using hard links, copying where linking fails.
+
+    Bundles are identical and Chrome only reads them, so every bundle can
+    share the same inodes as dist/. Falls back to a real copy across
+    devices or on filesystems without hard link support.
+    """
+    for root, _dirs, files in os.walk(src):
+        target_dir = os.path.join(dst, os.path.relpath(root, src))
+        os.makedirs(target_dir, exist_ok=True)
+        for name in files:
+            src_file = os.path.join(root, name)
+            dst_file = os.path.join(target_dir, name)
+            try:
+                os.link(src_file, dst_file, follow_symlinks=False)
+            except OSError:
+                shutil.copy2(src_file, dst_file)
 
 
 def create_profile_bundle(profile: dict) -> str:
-    """Copy dist/ to a profile-specific directory."""
-    slug = profile_slug(profile)
+    """Mirror dist/ into a profile-specific directory."""
+    slug = profile["slug"]
     dest = os.path.join(SCRIPT_DIR, f"dist-{slug}")
 
+    _wait_for_removal(dest)
     if os.path.exists(dest):
         shutil.rmtree(dest)
 
-    shutil.copytree(DIST_DIR, dest)
+    _hardlink_tree(DIST_DIR, dest)
     info(f"Created bundle: dist-{slug}/")
     return dest
 
 
+@functools.lru_cache(maxsize=None)
+def _norm_path(path: str) -> str:
+    """Normalize a path for comparison; memoized since the same extension
+    paths are compared on every poll of every profile."""
+    return os.path.normcase(os.path.normpath(path))
+
+
+def _load_json(path: str, prefix: str = ""):
+    """Decode a JSON file.
+
+    With a dotted prefix (e.g. "extensions.settings") only the object at
+    that path is returned; when ijson is available just that subtree is
+    built. Raises ValueError on malformed JSON and OSError on read failure.
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if prefix and ijson is not None:
+            try:
+                value = dict(ijson.kvitems(mm, prefix))
+            except ijson.JSONError as e:
+                raise ValueError(str(e)) from e
+        else:
+            with memoryview(mm) as view:
+                value = _json_loads(view)
+            for key in filter(None, prefix.split(".")):
+                value = value.get(key, {})
+    return value
+
+
+# `"name": "Claude (Headless)"` as it appears in our manifest, matched on raw bytes
+_MANIFEST_NAME_RE = re.compile(rb'"name"\s*:\s*' + re.escape(EXTENSION_NAME_MARKER))
+
+
+def _is_our_manifest(ext_path: str) -> bool:
+    """Check whether an extension directory holds our manifest.json.
+
+    Only the top of the file is matched against our name; decoding the
+    whole manifest (permissions, content scripts, ...) isn't needed.
+    """
+    try:
+        with open(os.path.join(ext_path, "manifest.json"), "rb") as f:
+            head = f.read(8192)
+    except OSError:
+        return False
+    return _MANIFEST_NAME_RE.search(head) is not None
+
+
+# (prefs path, expected bundle) -> ((st_mtime_ns, st_size), extension ID)
+_DETECT_CACHE: dict[tuple[str, str], tuple[tuple[int, int], str | None]] = {}
+
+
 def detect_extension_in_profile(profile: dict, expected_dist: str) -> str | None:
     """Detect our extension in a specific Chrome profile.
 
     Checks for extension whose path matches expected_dist or whose
-    manifest name is "Claude (Headless)".
+    manifest name is "Claude (Headless)". The answer is remembered until
+    Chrome rewrites the profile's Secure Preferences, so wakeups caused by
+    other files in the profile directory cost a single stat.
 
     Returns extension ID or None.
     """
-    prefs_path = os.path.join(profile["path"], "Secure Preferences")
+    prefs_path = os.path.join(profile["path"], SECURE_PREFS)
+    try:
+        st = os.stat(prefs_path)
+    except OSError:
+        return None
+
+    stamp = (st.st_mtime_ns, st.st_size)
+    key = (prefs_path, expected_dist)
+    cached = _DETECT_CACHE.get(key)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    ext_id = _find_extension(prefs_path, expected_dist)
+    _DETECT_CACHE[key] = (stamp, ext_id)
+    return ext_id
+
 
+def _find_extension(prefs_path: str, expected_dist: str) -> str | None:
+    """Look up our extension's ID in a Secure Preferences file.
+
+    Matches the extension loaded from expected_dist, or failing that any
+    unpacked extension whose manifest is ours (e.g. the user picked dist/
+    or another profile's bundle). detect_extension_in_profile's stat cache
+    keeps this to one decode per rewrite of the file.
+    """
     try:
-        with open(prefs_path, "r", encoding="utf-8") as f:
-            prefs = json.load(f)
-    except (json.JSONDecodeError, OSError):
+        exts = _load_json(prefs_path, "extensions.settings")
+    except (ValueError, OSError):
         return None
 
-    exts = prefs.get("extensions", {}).get("settings", {})
-    expected_norm = os.path.normcase(os.path.normpath(expected_dist))
+    expected_norm = _norm_path(expected_dist)
 
     for ext_id, ext_info in exts.items():
         ext_path = ext_info.get("path", "")
         if not ext_path:
             continue
 
-        ext_path_norm = os.path.normcase(os.path.normpath(ext_path))
+        ext_path_norm = _norm_path(ext_path)
 
         # Match by exact path
         if ext_path_norm == expected_norm:
             return ext_id
 
         # Match by manifest name (fallback)
-        if os.path.isdir(ext_path):
-            manifest_path = os.path.join(ext_path, "manifest.json")
-            try:
-                with open(manifest_path, "r", encoding="utf-8") as f:
-                    manifest = json.load(f)
-                if manifest.get("name") == "Claude (Headless)":
-                    return ext_id
-            except (json.JSONDecodeError, OSError):
-                pass
+        if _is_our_manifest(ext_path):
+            return ext_id
 
     return None
 
 
-def poll_extension_in_profile(profile: dict, expected_dist: str, attempts: int = 6, interval: float = 2.0) -> str | None:
-    """Poll Chrome's Secure Preferences for our extension, retrying with a delay."""
-    import time
-    for i in range(attempts):
-        ext_id = detect_extension_in_profile(profile, expected_dist)
-        if ext_id:
-            return ext_id
-        if i < attempts - 1:
-            print(f"\r  Waiting for Chrome to flush prefs... ({i+1}/{attempts})", end="", flush=True)
-            time.sleep(interval)
-    print()  # newline after progress
-    return None
+# Chrome saves prefs by writing a temp file and renaming it into place, so
+# the profile directory is watched rather than the file itself.
+PREFS_POLL_INTERVAL = 2.0
+
+# <sys/inotify.h>
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+# <fcntl.h> on Darwin; not exposed by the os module
+_O_EVTONLY = 0x8000
+
+# <winbase.h> / <winnt.h>
+_FILE_NOTIFY_CHANGE_FILE_NAME = 0x00000001
+_FILE_NOTIFY_CHANGE_LAST_WRITE = 0x00000010
+_WAIT_OBJECT_0 = 0x00000000
+
+
+@contextlib.contextmanager
+def _inotify_watch(profile_path: str):
+    libc = ctypes.CDLL(None, use_errno=True)
+    fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    if fd < 0:
+        raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+    try:
+        wd = libc.inotify_add_watch(fd, os.fsencode(profile_path), _IN_CLOSE_WRITE | _IN_MOVED_TO)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+        target = os.fsencode(SECURE_PREFS)
+
+        def wait(timeout: float) -> None:
+            deadline = time.monotonic() + timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                    return
+                buf = os.read(fd, 4096)
+                offset = 0
+                while offset < len(buf):
+                    _wd, _mask, _cookie, length = _INOTIFY_EVENT.unpack_from(buf, offset)
+                    offset += _INOTIFY_EVENT.size
+                    name = buf[offset:offset + length].rstrip(b"\0")
+                    offset += length
+                    if name == target:
+                        return
+
+        yield wait
+    finally:
+        os.close(fd)
+
+
+@contextlib.contextmanager
+def _kqueue_watch(profile_path: str):
+    fd = os.open(profile_path, _O_EVTONLY)
+    try:
+        kq = select.kqueue()
+        try:
+            kq.control([select.kevent(
+                fd,
+                filter=select.KQ_FILTER_VNODE,
+                flags=select.KQ_EV_ADD | select.KQ_EV_CLEAR,
+                fflags=select.KQ_NOTE_WRITE,
+            )], 0)
+
+            def wait(timeout: float) -> None:
+                kq.control(None, 1, timeout)
+
+            yield wait
+        finally:
+            kq.close()
+    finally:
+        os.close(fd)
+
+
+@contextlib.contextmanager
+def _win32_watch(profile_path: str):
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    kernel32.FindFirstChangeNotificationW.restype = ctypes.c_void_p
+    kernel32.FindFirstChangeNotificationW.argtypes = [ctypes.c_wchar_p, ctypes.c_int, ctypes.c_uint32]
+    kernel32.FindNextChangeNotification.argtypes = [ctypes.c_void_p]
+    kernel32.FindCloseChangeNotification.argtypes = [ctypes.c_void_p]
+    kernel32.WaitForSingleObject.argtypes = [ctypes.c_void_p, ctypes.c_uint32]
+
+    handle = kernel32.FindFirstChangeNotificationW(
+        profile_path, False,
+        _FILE_NOTIFY_CHANGE_FILE_NAME | _FILE_NOTIFY_CHANGE_LAST_WRITE,
+    )
+    if handle is None or handle == ctypes.c_void_p(-1).value:
+        raise ctypes.WinError(ctypes.get_last_error())
+    try:
+        def wait(timeout: float) -> None:
+            if kernel32.WaitForSingleObject(handle, int(timeout * 1000)) == _WAIT_OBJECT_0:
+                kernel32.FindNextChangeNotification(handle)
+
+        yield wait
+    finally:
+        kernel32.FindCloseChangeNotification(handle)
+
 
+def _sleep_wait(timeout: float) -> None:
+    time.sleep(min(timeout, PREFS_POLL_INTERVAL))
 
-def setup_profile(profile: dict) -> str | None:
-    """Set up extension for a single profile.
 
-    Creates a profile-specific bundle, guides the user to load it,
-    then detects the extension ID (with polling + manual fallback).
+@contextlib.contextmanager
+def _watch_prefs(profile_path: str):
+    """Yield a ``wait(timeout)`` callable that returns once Chrome writes the
+    profile's Secure Preferences (or the timeout expires).
 
-    Returns extension ID if successful, None otherwise.
+    Uses inotify on Linux, kqueue on macOS and directory change notifications
+    on Windows. Falls back to sleeping between polls if the platform
+    mechanism is unavailable.
     """
-    dist_path = create_profile_bundle(profile)
+    backend = {
+        "Linux": _inotify_watch,
+        "Darwin": _kqueue_watch,
+        "Windows": _win32_watch,
+    }.get(SYSTEM)
+
+    with contextlib.ExitStack() as stack:
+        wait = _sleep_wait
+        if backend:
+            try:
+                wait = stack.enter_context(backend(profile_path))
+            except (OSError, AttributeError):
+                pass
+        yield wait
+
+
+def poll_extension_in_profile(profile: dict, expected_dist: str, timeout: float = 12.0) -> str | None:
+    """Wait for our extension to appear in Chrome's Secure Preferences.
 
+    Re-checks each time Chrome writes the prefs file, giving up after
+    ``timeout`` seconds.
+    """
+    deadline = time.monotonic() + timeout
+    with _watch_prefs(profile["path"]) as wait:
+        while True:
+            ext_id = detect_extension_in_profile(profile, expected_dist)
+            if ext_id:
+                return ext_id
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            wait(remaining)
+
+
+def print_load_instructions(bundles: list[tuple[dict, str]]) -> None:
+    """Show one set of load instructions covering every (profile, bundle) pair."""
     print()
     print(f"  ┌──────────────────────────────────────────────────────")
-    print(f"  │  Profile: {profile['name']}")
+    print(f"  │  For each profile below:")
     print(f"  │")
-    print(f"  │  1. Open Chrome with this profile")
+    print(f"  │  1. Open Chrome with that profile")
     print(f"  │  2. Go to chrome://extensions")
     print(f"  │  3. Enable 'Developer mode' (top-right toggle)")
-    print(f"  │  4. Click 'Load unpacked' and select:")
-    print(f"  │     {dist_path}")
+    print(f"  │  4. Click 'Load unpacked' and select its bundle:")
+    for profile, dist_path in bundles:
+        print(f"  │")
+        print(f"  │  Profile: {profile['name']}")
+        print(f"  │     {dist_path}")
     print(f"  └──────────────────────────────────────────────────────")
     print()
 
-    input("  Press Enter after loading the extension...")
-
-    # Poll for detection (6 attempts, 2s apart = ~12s max)
-    info(f"Detecting extension in profile: {profile['name']}...")
-    ext_id = poll_extension_in_profile(profile, dist_path)
-
-    if ext_id:
-        info(f"Extension detected! ID: {ext_id}")
-        return ext_id
 
-    # Manual fallback
-    warn("Auto-detection failed (Chrome may not have flushed prefs to disk).")
+def prompt_extension_id(profile: dict) -> str | None:
+    """Ask the user for the extension ID after auto-detection failed."""
+    print()
+    warn(f"Auto-detection failed for {profile['name']} (Chrome may not have flushed prefs to disk).")
     print("  Copy the extension ID from chrome://extensions (shown under the extension name).")
     print()
     ext_id = input("  Paste extension ID (or press Enter to skip): ").strip()
@@ -507,25 +1078,28 @@ def setup_profile(profile: dict) -> str | None:
 
 def create_wrapper_script() -> str:
     """Create the platform-specific wrapper that Chrome launches."""
+    _wait_for_removal(WEBRIG_DIR)
     os.makedirs(WEBRIG_DIR, exist_ok=True)
 
     if SYSTEM == "Windows":
         bat_path = os.path.join(WEBRIG_DIR, "host.bat")
-        python_exe = sys.executable.replace("/", "\\")
-        host_script_win = HOST_SCRIPT.replace("/", "\\")
         with open(bat_path, "w") as f:
-            f.write(f'@echo off\r\n"{python_exe}" "{host_script_win}" %*\r\n')
+            f.write(f'@echo off\r\n"{PYTHON_EXE}" "{HOST_SCRIPT}" %*\r\n')
         info(f"Created wrapper: {bat_path}")
         return bat_path
     else:
         # Ensure host.py is executable with a shebang
-        os.chmod(HOST_SCRIPT, 0o755)
-        with open(HOST_SCRIPT, "r") as f:
-            content = f.read()
-        if not content.startswith("#!"):
-            with open(HOST_SCRIPT, "w") as f:
-                f.write(f"#!{sys.executable}\n" + content)
+        with open(HOST_SCRIPT, "rb") as f:
+            has_shebang = f.read(2) == b"#!"
+        if not has_shebang:
+            # Stream into a sibling file and swap it in atomically
+            tmp_path = HOST_SCRIPT + ".tmp"
+            with open(HOST_SCRIPT, "rb") as src, open(tmp_path, "wb") as dst:
+                dst.write(b"#!" + os.fsencode(PYTHON_EXE) + b"\n")
+                shutil.copyfileobj(src, dst, 64 * 1024)
+            os.replace(tmp_path, HOST_SCRIPT)
             info(f"Added shebang to {HOST_SCRIPT}")
+        os.chmod(HOST_SCRIPT, 0o755)
         info(f"Host script: {HOST_SCRIPT}")
         return HOST_SCRIPT
 
@@ -535,12 +1109,12 @@ def write_manifest(host_path: str, origins: list[str]) -> str:
     manifest = {
         "name": HOST_NAME,
         "description": "Browser extension native messaging host",
-        "path": host_path.replace("/", "\\") if SYSTEM == "Windows" else host_path,
+        "path": os.path.normpath(host_path),
         "type": "stdio",
         "allowed_origins": origins,
     }
-    with open(manifest_path, "w") as f:
-        json.dump(manifest, f, indent=2)
+    with open(manifest_path, "wb") as f:
+        f.write(_json_dumps(manifest))
     info(f"Wrote manifest: {manifest_path}")
     return manifest_path
 
@@ -558,15 +1132,24 @@ def register_windows(manifest_path: str) -> None:
         print(f"  Manually create: HKCU\\{key_path} = {manifest_path}")
 
 
+def _atomic_symlink(src: str, dst: str) -> None:
+    """Point dst at src, replacing any existing file or link in one rename."""
+    tmp = dst + ".tmp"
+    try:
+        os.unlink(tmp)
+    except FileNotFoundError:
+        pass
+    os.symlink(src, tmp)
+    os.replace(tmp, dst)
+
+
 def register_macos(manifest_path: str) -> None:
     target_dir = os.path.expanduser(
         "~/Library/Application Support/Google/Chrome/NativeMessagingHosts"
     )
     os.makedirs(target_dir, exist_ok=True)
     target = os.path.join(target_dir, f"{HOST_NAME}.json")
-    if os.path.exists(target):
-        os.remove(target)
-    os.symlink(manifest_path, target)
+    _atomic_symlink(manifest_path, target)
     info(f"Symlinked: {target} -> {manifest_path}")
 
 
@@ -574,9 +1157,7 @@ def register_linux(manifest_path: str) -> None:
     target_dir = os.path.expanduser("~/.config/google-chrome/NativeMessagingHosts")
     os.makedirs(target_dir, exist_ok=True)
     target = os.path.join(target_dir, f"{HOST_NAME}.json")
-    if os.path.exists(target):
-        os.remove(target)
-    os.symlink(manifest_path, target)
+    _atomic_symlink(manifest_path, target)
     info(f"Symlinked: {target} -> {manifest_path}")
 
 
@@ -599,6 +1180,34 @@ def register_native_host(extension_ids: list[str]) -> None:
         register_linux(manifest_path)
 
 
+def print_install_summary(extension_ids: list[str], profiles: list[dict]) -> None:
+    """Print the closing summary as a single write."""
+    lines = [
+        "",
+        f"  Registered {len(extension_ids)} extension(s):",
+        *(f"    chrome-extension://{eid}/" for eid in extension_ids),
+        "",
+        "  Profile bundles:",
+        *(f"    dist-{p['slug']}/  ->  {p['name']}" for p in profiles),
+        "",
+        f"  App data: {WEBRIG_DIR}",
+        "",
+        "  Next steps:",
+        "    1. Restart Chrome (or reload the extensions)",
+        "    2. Start the WebSocket server:",
+        f'       python "{HOST_SCRIPT}"',
+        f"    3. Server runs on ws://127.0.0.1:{WS_PORT}",
+        f"    4. Logs are stored in: {WEBRIG_DIR}",
+        "",
+        "  To reinstall after code changes:",
+        "    python install.py              # rebuild + re-register",
+        "    python install.py --skip-build # re-register only",
+        "",
+    ]
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
+
+
 # ── Main ─────────────────────────────────────────────────────────
 
 def main() -> None:
@@ -630,12 +1239,12 @@ def main() -> None:
         if not build_extension():
             sys.exit(1)
 
-    # Step 4: Python dependencies
-    if not install_python_deps():
-        warn("Continuing without websockets — native host may fail at runtime.")
+    # Step 4: Python dependencies (pip finishes while profiles are set up)
+    python_deps = start_python_deps_install()
 
     # Step 5: Set up .webrig app data directory
     header("Setting up app data directory")
+    _wait_for_removal(WEBRIG_DIR)
     os.makedirs(WEBRIG_DIR, exist_ok=True)
     info(f"App data directory: {WEBRIG_DIR}")
 
@@ -646,11 +1255,28 @@ def main() -> None:
     # Step 7: Set up extension for each selected profile
     header("Setting up extension for each profile")
 
+    bundles = [(profile, create_profile_bundle(profile)) for profile in selected]
+    print_load_instructions(bundles)
+    input("  Press Enter after loading ALL extensions...")
+
+    # Detect every profile at once; the manual fallback runs afterwards
+    info("Detecting extensions (waiting for Chrome to flush prefs)...")
+    detected: dict[str, str | None] = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(bundles)) as pool:
+        detections = {
+            pool.submit(poll_extension_in_profile, profile, dist_path): profile
+            for profile, dist_path in bundles
+        }
+        for future in concurrent.futures.as_completed(detections):
+            profile = detections[future]
+            ext_id = future.result()
+            if ext_id:
+                info(f"Extension detected in {profile['name']}! ID: {ext_id}")
+            detected[profile["dir"]] = ext_id
+
     extension_ids = []
-    for i, profile in enumerate(selected, 1):
-        print()
-        info(f"Profile {i}/{len(selected)}: {profile['name']}")
-        ext_id = setup_profile(profile)
+    for profile in selected:
+        ext_id = detected[profile["dir"]] or prompt_extension_id(profile)
         if ext_id:
             extension_ids.append(ext_id)
         else:
@@ -660,39 +1286,26 @@ def main() -> None:
         error("No extension IDs detected. Cannot register native host.")
         sys.exit(1)
 
+    if not finish_python_deps_install(python_deps):
+        warn("Continuing without websockets — native host will fail at runtime.")
+
     # Step 8: Register native host with all detected IDs
     register_native_host(extension_ids)
 
+    # Surface any failure from removing old bundles that weren't recreated
+    _wait_for_removal()
+
     # Done — final summary
     header("Installation complete")
-    print()
-    print(f"  Registered {len(extension_ids)} extension(s):")
-    for eid in extension_ids:
-        print(f"    chrome-extension://{eid}/")
-    print()
-    print(f"  Profile bundles:")
-    for p in selected:
-        slug = profile_slug(p)
-        print(f"    dist-{slug}/  ->  {p['name']}")
-    print()
-    print(f"  App data: {WEBRIG_DIR}")
-    print()
-    print("  Next steps:")
-    print("    1. Restart Chrome (or reload the extensions)")
-    print(f"    2. Start the WebSocket server:")
-    print(f'       python "{HOST_SCRIPT}"')
-    print(f"    3. Server runs on ws://127.0.0.1:{WS_PORT}")
-    print(f"    4. Logs are stored in: {WEBRIG_DIR}")
-    print()
-    print("  To reinstall after code changes:")
-    print("    python install.py              # rebuild + re-register")
-    print("    python install.py --skip-build # re-register only")
-    print()
+    print_install_summary(extension_ids, selected)
 
 
 if __name__ == "__main__":
     try:
         main()
     except KeyboardInterrupt:
-        print("\n  Aborted.")
-        sys.exit(1)
+        print("\n  Aborted.", flush=True)
+        # sys.exit would wait for the background pip/cleanup threads to
+        # finish; pip got the same SIGINT, and leftover trees are removed
+        # by the next run's cleanup
+        os._exit(1)
@@ -27,42 +27,92 @@ from dataclasses import dataclass, field
 
 import websockets
 
+try:
+    import orjson  # faster JSON codec; the stdlib json module is the fallback
+except ImportError:
+    orjson = None
+
+try:
+    import uvloop  # libuv-based event loop; not available on Windows
+except ImportError:
+    uvloop = None
+
 HOST = "127.0.0.1"
 DEFAULT_PORT = 7680
 
+# Optional handshake subprotocols that let a client declare its role up front
+AGENT_SUBPROTOCOL = "webrig-agent"
+EXTENSION_SUBPROTOCOL = "webrig-extension"
+
+# Messages queued for one connection before it is treated as stalled and dropped
+OUTBOX_LIMIT = 256
+# How long a burst of replies may wait for room in a full queue before the peer is dropped
+OUTBOX_STALL_TIMEOUT = 5
+
 logger = logging.getLogger("webrig")
 
 
+def _json_loads(data: str | bytes):
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(obj) -> str:
+    """Encode obj as JSON text. WebSocket sends must be str to go out as text frames."""
+    if orjson:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
+
+
 # ── Native Messaging I/O (length-prefixed JSON over stdin/stdout) ──
 
+_NATIVE_LEN = struct.Struct("<I")  # uint32 length prefix on every frame
+
+
 def native_read():
     """Read one native messaging message from stdin. Returns None on EOF."""
     raw_len = sys.stdin.buffer.read(4)
     if not raw_len or len(raw_len) < 4:
         return None
-    msg_len = struct.unpack("<I", raw_len)[0]
+    (msg_len,) = _NATIVE_LEN.unpack(raw_len)
     raw_msg = sys.stdin.buffer.read(msg_len)
     if not raw_msg:
         return None
-    return json.loads(raw_msg.decode("utf-8"))
+    return _json_loads(raw_msg)
+
+
+def _encode_native(msg: dict) -> bytes:
+    """Encode one native messaging frame (length prefix + UTF-8 JSON)."""
+    data = orjson.dumps(msg) if orjson else json.dumps(msg).encode("utf-8")
+    return _NATIVE_LEN.pack(len(data)) + data
+
+
+def _write_native_frame(frame: bytes):
+    # Header and body go out in one write so the reader never sees a bare length prefix
+    sys.stdout.buffer.write(frame)
+    sys.stdout.buffer.flush()
 
 
 def native_write(msg: dict):
     """Write one native messaging message to stdout."""
-    data = json.dumps(msg).encode("utf-8")
-    sys.stdout.buffer.write(struct.pack("<I", len(data)))
-    sys.stdout.buffer.write(data)
-    sys.stdout.buffer.flush()
+    _write_native_frame(_encode_native(msg))
+
+
+# Replies to Chrome's keepalive messages never change, so encode them once
+_PONG_FRAME = _encode_native({"type": "pong", "status": "running"})
+_STATUS_FRAME = _encode_native({"type": "status", "ws_port": DEFAULT_PORT, "status": "running"})
 
 
-def native_messaging_loop(shutdown_event: threading.Event):
+def native_messaging_loop(on_shutdown=None):
     """
     Read from Chrome's native messaging stdin in a background thread.
-    When stdin closes (Chrome killed the extension/port), signal shutdown.
+    When stdin closes (Chrome killed the extension/port), signal shutdown
+    by calling on_shutdown (used to wake the event loop from this thread).
     Responds to ping messages to confirm the host is alive.
     """
     try:
-        while not shutdown_event.is_set():
+        while True:
             msg = native_read()
             if msg is None:
                 # stdin closed — Chrome disconnected
@@ -71,15 +121,16 @@ def native_messaging_loop(shutdown_event: threading.Event):
 
             msg_type = msg.get("type", "")
             if msg_type == "ping":
-                native_write({"type": "pong", "status": "running"})
+                _write_native_frame(_PONG_FRAME)
             elif msg_type == "get_status":
-                native_write({"type": "status", "ws_port": DEFAULT_PORT, "status": "running"})
+                _write_native_frame(_STATUS_FRAME)
             else:
                 logger.debug(f"Native message ignored: {msg_type}")
     except Exception as e:
         logger.error(f"Native messaging loop error: {e}")
     finally:
-        shutdown_event.set()
+        if on_shutdown:
+            on_shutdown()
 
 
 def is_native_messaging() -> bool:
@@ -89,7 +140,11 @@ def is_native_messaging() -> bool:
 
 # ── WebSocket Server ──────────────────────────────────────────────
 
-@dataclass
+# Broadcast to every browser on list_tab_groups; constant, so encoded once
+_LIST_TAB_GROUPS_REQUEST = _json_dumps({"type": "list_tab_groups"})
+
+
+@dataclass(slots=True)
 class BrowserConnection:
     ws: object
     email: str
@@ -97,6 +152,36 @@ class BrowserConnection:
     tool_schemas: list[dict] = field(default_factory=list)
 
 
+@dataclass(slots=True)
+class TabGroupsFanOut:
+    """Replies collected for one list_tab_groups request, with a single future for all of them."""
+    waiting: dict[str, object]  # email -> browser ws the request went to
+    done: asyncio.Future
+    replies: dict[str, list] = field(default_factory=dict)
+
+    def resolve(self, email: str, ws, groups: list):
+        # Only the socket that was asked may answer; a replaced connection for the same email may not
+        if self.waiting.get(email) is not ws:
+            return
+        del self.waiting[email]
+        self.replies[email] = groups
+        if not self.waiting and not self.done.done():
+            self.done.set_result(None)
+
+
+def _as_text(raw: str | bytes, msg: dict) -> str:
+    """Return a received frame ready to forward as text: as-is if it was text, re-encoded if binary."""
+    return raw if isinstance(raw, str) else _json_dumps(msg)
+
+
+def _select_subprotocol(connection, subprotocols):
+    """Accept a WebRig role subprotocol if offered; clients offering none are still accepted."""
+    for proto in (AGENT_SUBPROTOCOL, EXTENSION_SUBPROTOCOL):
+        if proto in subprotocols:
+            return proto
+    return None
+
+
 class WebRigServer:
     def __init__(self, host: str, port: int):
         self.host = host
@@ -104,32 +189,87 @@ class WebRigServer:
         self.browsers: dict[str, BrowserConnection] = {}
         self.agents: set = set()
         self.unclassified: set = set()
-        self.pending_requests: dict[str, object] = {}  # tool_use_id -> agent ws
+        self.pending_requests: dict[str, tuple[object, object]] = {}  # tool_use_id -> (agent ws, browser ws)
+        self._pending_by_ws: dict[object, set[str]] = {}  # agent or browser ws -> its pending tool_use_ids
         self.pending_list_tools: dict[str, object] = {}  # email -> agent ws
-        self.pending_tab_groups: dict[str, asyncio.Future] = {}  # email -> Future
+        self.pending_tab_groups: dict[str, TabGroupsFanOut] = {}  # email -> fan-out awaiting it
+        self._browser_emails: dict[object, str] = {}  # browser ws -> email, kept until that socket is cleaned up
+        self._outboxes: dict[object, asyncio.Queue] = {}  # ws -> queued outbound messages
+        self._browsers_list_cache: str | None = None  # encoded browsers_list, reset on connect/disconnect
+        self._solo_browser: BrowserConnection | None = None  # the only browser, when exactly one is connected
 
     async def handler(self, websocket):
-        """Per-connection handler. Classifies the connection on first message."""
-        self.unclassified.add(websocket)
+        """Per-connection handler. Classifies the connection by subprotocol, else on first message."""
+        if websocket.subprotocol == AGENT_SUBPROTOCOL:
+            self.agents.add(websocket)
+        elif websocket.subprotocol != EXTENSION_SUBPROTOCOL:
+            self.unclassified.add(websocket)
+        outbox = self._outboxes[websocket] = asyncio.Queue(maxsize=OUTBOX_LIMIT)
+        sender = asyncio.create_task(self._sender(websocket, outbox))
         try:
             async for raw_message in websocket:
                 try:
-                    msg = json.loads(raw_message)
+                    msg = _json_loads(raw_message)
                 except json.JSONDecodeError:
                     logger.warning("Non-JSON message received, ignoring")
                     continue
-                await self.route_message(websocket, msg)
+                await self.route_message(websocket, raw_message, msg)
         except websockets.exceptions.ConnectionClosed:
             pass
         finally:
             await self.cleanup(websocket)
+            sender.cancel()
 
-    async def route_message(self, ws, msg: dict):
+    async def _sender(self, ws, outbox: asyncio.Queue):
+        """Drain one connection's outbound queue, so routing never waits on that socket's backpressure."""
+        while True:
+            payload, tool_use_id = await outbox.get()
+            try:
+                await ws.send(payload)
+            except websockets.exceptions.ConnectionClosed:
+                return  # the handler's receive loop ends too and runs cleanup
+            except Exception as e:
+                logger.warning(f"Send failed: {e}")
+                if tool_use_id is not None:
+                    self._fail_tool_call(tool_use_id, f"Failed to send to browser: {e}")
+
+    def _send(self, ws, payload: str, tool_use_id: str | None = None):
+        """Queue a text frame for ws. Messages to a connection that is already gone are dropped.
+
+        tool_use_id marks a forwarded tool_call, failed back to its agent if the send errors.
+        """
+        outbox = self._outboxes.get(ws)
+        if outbox is None:
+            return
+        try:
+            outbox.put_nowait((payload, tool_use_id))
+        except asyncio.QueueFull:
+            self._drop_stalled(ws)
+
+    async def _send_burst_item(self, ws, payload: str):
+        """Like _send, but wait for room when a burst fills the queue and drop the peer only if it stays full."""
+        outbox = self._outboxes.get(ws)
+        if outbox is None:
+            return
+        try:
+            await asyncio.wait_for(outbox.put((payload, None)), OUTBOX_STALL_TIMEOUT)
+        except asyncio.TimeoutError:
+            self._drop_stalled(ws)
+
+    def _drop_stalled(self, ws):
+        # The peer stopped reading; drop it rather than buffer without bound.
+        # Its handler then ends and cleanup fails whatever was pending on it.
+        if self._outboxes.pop(ws, None) is not None:
+            logger.warning(f"Outbound queue full ({OUTBOX_LIMIT} messages), dropping connection")
+            ws.transport.abort()
+
+    async def route_message(self, ws, raw: str | bytes, msg: dict):
         msg_type = msg.get("type")
 
         # Browser identification: first message is extension_connected
         if msg_type == "extension_connected":
             self.unclassified.discard(ws)
+            self.agents.discard(ws)  # in case it handshook as an agent
             email = msg.get("email", "unknown")
             tools = msg.get("tools", [])
             tool_schemas = msg.get("tool_schemas", [])
@@ -146,166 +286,201 @@ class WebRigServer:
             self.browsers[email] = BrowserConnection(
                 ws=ws, email=email, tools=tools, tool_schemas=tool_schemas,
             )
+            self._browser_emails[ws] = email
+            self._browsers_changed()
             logger.info(f"Browser connected: {email} ({len(tools)} tools)")
             return
 
-        # Promote unclassified to agent on first non-browser message
-        if ws in self.unclassified:
+        # Route based on connection type, promoting unclassified to agent on first non-browser message
+        if ws in self.agents:
+            await self.handle_agent_message(ws, raw, msg)
+        elif ws in self.unclassified:
             self.unclassified.discard(ws)
             self.agents.add(ws)
-
-        # Route based on connection type
-        if ws in self.agents:
-            await self.handle_agent_message(ws, msg)
+            await self.handle_agent_message(ws, raw, msg)
         else:
-            await self.handle_browser_message(ws, msg)
+            await self.handle_browser_message(ws, raw, msg)
 
     # ── Agent message handling ────────────────────────────────────
 
-    async def handle_agent_message(self, ws, msg: dict):
+    async def handle_agent_message(self, ws, raw: str | bytes, msg: dict):
         msg_type = msg.get("type")
+        handler = self._AGENT_HANDLERS.get(msg_type)
+        if handler:
+            await handler(self, ws, raw, msg)
+        else:
+            logger.warning(f"Unknown agent message type: {msg_type}")
 
-        if msg_type == "list_browsers":
+    async def _agent_list_browsers(self, ws, raw: str | bytes, msg: dict):
+        if self._browsers_list_cache is None:
             browsers_info = [
                 {"email": email, "tools_count": len(bc.tools)}
                 for email, bc in self.browsers.items()
             ]
-            await ws.send(json.dumps({
+            self._browsers_list_cache = _json_dumps({
                 "type": "browsers_list",
                 "browsers": browsers_info,
-            }))
+            })
+        self._send(ws, self._browsers_list_cache)
 
-        elif msg_type == "list_tools":
-            browser = self._resolve_browser(msg.get("browser"))
-            if not browser:
-                await ws.send(json.dumps(self._no_browser_error()))
-                return
-            resp = {
-                "type": "tool_list",
-                "tools": browser.tools,
-                "tool_schemas": browser.tool_schemas,
-                "browser": browser.email,
-            }
-            if len(self.browsers) > 1:
-                resp["note"] = "Multiple browsers connected. Use --browser to target a specific one."
-            await ws.send(json.dumps(resp))
-
-        elif msg_type == "tool_call":
-            browser = self._resolve_browser(msg.get("browser"))
-            if not browser:
-                tool_use_id = msg.get("tool_use_id", "")
-                await ws.send(json.dumps({
-                    "type": "tool_result",
-                    "tool_use_id": tool_use_id,
-                    "content": self._no_browser_error().get("message", "No browser"),
-                    "is_error": True,
-                }))
-                return
+    async def _agent_list_tools(self, ws, raw: str | bytes, msg: dict):
+        browser = self._resolve_browser(msg.get("browser"))
+        if not browser:
+            self._send(ws, _json_dumps(self._no_browser_error()))
+            return
+        resp = {
+            "type": "tool_list",
+            "tools": browser.tools,
+            "tool_schemas": browser.tool_schemas,
+            "browser": browser.email,
+        }
+        if len(self.browsers) > 1:
+            resp["note"] = "Multiple browsers connected. Use --browser to target a specific one."
+        self._send(ws, _json_dumps(resp))
 
+    async def _agent_tool_call(self, ws, raw: str | bytes, msg: dict):
+        browser = self._resolve_browser(msg.get("browser"))
+        if not browser:
             tool_use_id = msg.get("tool_use_id", "")
-            self.pending_requests[tool_use_id] = ws
-
-            forward = {k: v for k, v in msg.items() if k != "browser"}
-            try:
-                await browser.ws.send(json.dumps(forward))
-            except Exception as e:
-                self.pending_requests.pop(tool_use_id, None)
-                await ws.send(json.dumps({
-                    "type": "tool_result",
-                    "tool_use_id": tool_use_id,
-                    "content": f"Failed to send to browser: {e}",
-                    "is_error": True,
-                }))
-
-        elif msg_type == "list_tab_groups":
-            # Fan out to all connected browsers and aggregate results
-            all_groups = []
-            futures = {}
-            loop = asyncio.get_event_loop()
-
-            for email, bc in self.browsers.items():
-                fut = loop.create_future()
-                self.pending_tab_groups[email] = fut
-                futures[email] = fut
-                try:
-                    await bc.ws.send(json.dumps({"type": "list_tab_groups"}))
-                except Exception as e:
-                    logger.warning(f"Failed to send list_tab_groups to {email}: {e}")
-                    fut.set_result([])
-
-            # Wait for all browsers to respond (5s timeout)
-            for email, fut in futures.items():
-                try:
-                    groups = await asyncio.wait_for(fut, timeout=5)
-                    for g in groups:
-                        g["browser"] = email
-                    all_groups.extend(groups)
-                except asyncio.TimeoutError:
-                    logger.warning(f"Timeout waiting for tab groups from {email}")
-                finally:
-                    self.pending_tab_groups.pop(email, None)
-
-            await ws.send(json.dumps({
-                "type": "tab_groups_list",
-                "groups": all_groups,
+            self._send(ws, _json_dumps({
+                "type": "tool_result",
+                "tool_use_id": tool_use_id,
+                "content": self._no_browser_error().get("message", "No browser"),
+                "is_error": True,
             }))
+            return
+
+        tool_use_id = msg.get("tool_use_id", "")
+        self._add_pending(tool_use_id, ws, browser.ws)
 
+        # Forward the frame as received unless the routing field must be stripped
+        if "browser" in msg:
+            forward = _json_dumps({k: v for k, v in msg.items() if k != "browser"})
         else:
-            logger.warning(f"Unknown agent message type: {msg_type}")
+            forward = _as_text(raw, msg)
+        # If the browser drops before this goes out, cleanup fails the pending request
+        self._send(browser.ws, forward, tool_use_id)
+
+    async def _agent_list_tab_groups(self, ws, raw: str | bytes, msg: dict):
+        # Fan out to all connected browsers and aggregate results
+        all_groups = []
+        loop = asyncio.get_running_loop()
+
+        targets = list(self.browsers.items())
+        fanout = TabGroupsFanOut(waiting={email: bc.ws for email, bc in targets}, done=loop.create_future())
+        for email, _bc in targets:
+            self.pending_tab_groups[email] = fanout
+
+        # Each browser's sender task writes it, so one slow socket doesn't hold up the rest
+        for _email, bc in targets:
+            self._send(bc.ws, _LIST_TAB_GROUPS_REQUEST)
+
+        # Wait for all browsers to respond (5s timeout for the whole fan-out)
+        if fanout.waiting:
+            await asyncio.wait((fanout.done,), timeout=5)
+        fanout.done.cancel()
+        for email, _bc in targets:
+            if self.pending_tab_groups.get(email) is fanout:
+                del self.pending_tab_groups[email]
+            groups = fanout.replies.get(email)
+            if groups is None:
+                logger.warning(f"Timeout waiting for tab groups from {email}")
+                continue
+            for g in groups:
+                g["browser"] = email
+            all_groups.extend(groups)
+
+        self._send(ws, _json_dumps({
+            "type": "tab_groups_list",
+            "groups": all_groups,
+        }))
+
+    _AGENT_HANDLERS = {
+        "list_browsers": _agent_list_browsers,
+        "list_tools": _agent_list_tools,
+        "tool_call": _agent_tool_call,
+        "list_tab_groups": _agent_list_tab_groups,
+    }
 
     # ── Browser message handling ──────────────────────────────────
 
-    async def handle_browser_message(self, ws, msg: dict):
+    async def handle_browser_message(self, ws, raw: str | bytes, msg: dict):
         msg_type = msg.get("type")
+        handler = self._BROWSER_HANDLERS.get(msg_type)
+        if handler:
+            await handler(self, ws, raw, msg)
+        elif msg_type != "pong":
+            logger.warning(f"Unknown browser message type: {msg_type}")
 
-        if msg_type == "tool_result":
-            tool_use_id = msg.get("tool_use_id", "")
-            agent_ws = self.pending_requests.pop(tool_use_id, None)
+    async def _browser_tool_result(self, ws, raw: str | bytes, msg: dict):
+        tool_use_id = msg.get("tool_use_id", "")
+        agent_ws = self._pop_pending(tool_use_id)
+        if agent_ws:
+            self._send(agent_ws, _as_text(raw, msg))
+
+    async def _browser_tool_list(self, ws, raw: str | bytes, msg: dict):
+        email = self._find_browser_email(ws)
+        if email:
+            agent_ws = self.pending_list_tools.pop(email, None)
             if agent_ws:
-                try:
-                    await agent_ws.send(json.dumps(msg))
-                except Exception:
-                    pass
+                self._send(agent_ws, _as_text(raw, msg))
 
-        elif msg_type == "tool_list":
-            email = self._find_browser_email(ws)
-            if email:
-                agent_ws = self.pending_list_tools.pop(email, None)
-                if agent_ws:
-                    try:
-                        await agent_ws.send(json.dumps(msg))
-                    except Exception:
-                        pass
-
-        elif msg_type == "tab_groups_list":
-            email = self._find_browser_email(ws)
-            if email and email in self.pending_tab_groups:
-                fut = self.pending_tab_groups[email]
-                if not fut.done():
-                    fut.set_result(msg.get("groups", []))
-
-        elif msg_type == "pong":
-            pass
+    async def _browser_tab_groups_list(self, ws, raw: str | bytes, msg: dict):
+        email = self._find_browser_email(ws)
+        fanout = self.pending_tab_groups.get(email)
+        if fanout is not None:
+            fanout.resolve(email, ws, msg.get("groups", []))
 
-        else:
-            logger.warning(f"Unknown browser message type: {msg_type}")
+    _BROWSER_HANDLERS = {
+        "tool_result": _browser_tool_result,
+        "tool_list": _browser_tool_list,
+        "tab_groups_list": _browser_tab_groups_list,
+    }
 
     # ── Helpers ───────────────────────────────────────────────────
 
     def _resolve_browser(self, browser_hint: str | None):
-        if not self.browsers:
-            return None
         if browser_hint:
             return self.browsers.get(browser_hint)
-        if len(self.browsers) == 1:
-            return next(iter(self.browsers.values()))
-        return None
+        return self._solo_browser
+
+    def _browsers_changed(self):
+        """Refresh state derived from self.browsers after a connect or disconnect."""
+        self._browsers_list_cache = None
+        self._solo_browser = next(iter(self.browsers.values())) if len(self.browsers) == 1 else None
 
     def _find_browser_email(self, ws) -> str | None:
-        for email, bc in self.browsers.items():
-            if bc.ws is ws:
-                return email
-        return None
+        return self._browser_emails.get(ws)
+
+    def _add_pending(self, tool_use_id: str, agent_ws, browser_ws):
+        self._pop_pending(tool_use_id)  # a reused id replaces the older call
+        self.pending_requests[tool_use_id] = (agent_ws, browser_ws)
+        self._pending_by_ws.setdefault(agent_ws, set()).add(tool_use_id)
+        self._pending_by_ws.setdefault(browser_ws, set()).add(tool_use_id)
+
+    def _pop_pending(self, tool_use_id: str):
+        """Forget a pending tool call and return the agent ws waiting on it, if any."""
+        entry = self.pending_requests.pop(tool_use_id, None)
+        if entry is None:
+            return None
+        for owner in entry:
+            tids = self._pending_by_ws.get(owner)
+            if tids is not None:
+                tids.discard(tool_use_id)
+                if not tids:
+                    del self._pending_by_ws[owner]
+        return entry[0]
+
+    def _fail_tool_call(self, tool_use_id: str, content: str):
+        """Answer a pending tool call with an error and forget it."""
+        agent_ws = self._pop_pending(tool_use_id)
+        if agent_ws is not None:
+            self._send(agent_ws, _json_dumps({
+                "type": "tool_result",
+                "tool_use_id": tool_use_id,
+                "content": content,
+                "is_error": True,
+            }))
 
     def _no_browser_error(self) -> dict:
         if not self.browsers:
@@ -316,41 +491,43 @@ class WebRigServer:
         }
 
     async def cleanup(self, ws):
+        self._outboxes.pop(ws, None)
         self.unclassified.discard(ws)
         self.agents.discard(ws)
 
-        emails_to_remove = [e for e, bc in self.browsers.items() if bc.ws is ws]
-        for email in emails_to_remove:
-            del self.browsers[email]
-            logger.info(f"Browser disconnected: {email}")
-
-            stale_requests = [
-                (tid, agent_ws) for tid, agent_ws in self.pending_requests.items()
-            ]
-            for tid, agent_ws in stale_requests:
-                try:
-                    await agent_ws.send(json.dumps({
-                        "type": "tool_result",
-                        "tool_use_id": tid,
-                        "content": f"Browser '{email}' disconnected",
-                        "is_error": True,
-                    }))
-                except Exception:
-                    pass
-                self.pending_requests.pop(tid, None)
-
-        if ws in self.agents or not emails_to_remove:
-            stale = [k for k, v in self.pending_requests.items() if v is ws]
-            for k in stale:
-                del self.pending_requests[k]
+        email = self._browser_emails.pop(ws, None)
+        if email is not None:
+            current = self.browsers.get(email)
+            if current is not None and current.ws is ws:  # else a reconnect already replaced it
+                del self.browsers[email]
+                self._browsers_changed()
+                logger.info(f"Browser disconnected: {email}")
+            fanout = self.pending_tab_groups.get(email)
+            if fanout is not None:
+                fanout.resolve(email, ws, [])
+
+        # Fail the tool calls routed to this browser; drop the ones this agent was waiting on
+        for tid in self._pending_by_ws.pop(ws, ()):
+            agent_ws = self._pop_pending(tid)
+            if agent_ws is not None and agent_ws is not ws:
+                # One error per pending call can outrun the agent's sender, so wait for room
+                await self._send_burst_item(agent_ws, _json_dumps({
+                    "type": "tool_result",
+                    "tool_use_id": tid,
+                    "content": f"Browser '{email}' disconnected",
+                    "is_error": True,
+                }))
 
-    async def run(self, shutdown_event: threading.Event | None = None):
-        async with websockets.serve(self.handler, self.host, self.port):
+    async def run(self, shutdown_event: asyncio.Event | None = None):
+        # Clients are all on loopback, so permessage-deflate would only cost CPU
+        async with websockets.serve(
+            self.handler, self.host, self.port, compression=None,
+            select_subprotocol=_select_subprotocol,
+        ):
             logger.info(f"Listening on ws://{self.host}:{self.port}")
             if shutdown_event:
-                # Poll the threading event so we stop when native messaging stdin closes
-                while not shutdown_event.is_set():
-                    await asyncio.sleep(1)
+                # Set from the native messaging thread when stdin closes
+                await shutdown_event.wait()
                 logger.info("Shutdown event received, stopping server")
             else:
                 await asyncio.Future()  # run forever
@@ -403,19 +580,26 @@ def main():
     logger.info(f"WebRig server starting (log dir: {log_dir})")
 
     server = WebRigServer(args.host, args.port)
-    shutdown_event = threading.Event()
+    loop = uvloop.new_event_loop() if uvloop else asyncio.new_event_loop()
+    server_shutdown = asyncio.Event()
+
+    def wake_server():
+        # Runs on the stdin thread; after a signal the loop may already be closed
+        try:
+            loop.call_soon_threadsafe(server_shutdown.set)
+        except RuntimeError:
+            pass
 
     if native_mode:
         # Run native messaging stdin reader in a background thread
-        nm_thread = threading.Thread(target=native_messaging_loop, args=(shutdown_event,), daemon=True)
+        nm_thread = threading.Thread(
+            target=native_messaging_loop, args=(wake_server,), daemon=True,
+        )
         nm_thread.start()
 
     # Graceful shutdown on SIGINT/SIGTERM
-    loop = asyncio.new_event_loop()
-
     def shutdown():
         logger.info("Shutting down...")
-        shutdown_event.set()
         for task in asyncio.all_tasks(loop):
             task.cancel()
 
@@ -426,7 +610,7 @@ def main():
             pass
 
     try:
-        loop.run_until_complete(server.run(shutdown_event if native_mode else None))
+        loop.run_until_complete(server.run(server_shutdown if native_mode else None))
     except (KeyboardInterrupt, asyncio.CancelledError):
         pass
     finally: